@@ -0,0 +1,5 @@
+import os
+
+### 存储引擎："mongo" 连接 MongoDB，"memory" 使用进程内存储（无需 mongod） ###
+Storage_Engine = os.getenv("BOOKSTORE_STORAGE", "mongo")
+MongoDB_URI = os.getenv("MONGODB_API")
@@ -1,18 +1,20 @@
-import pymongo
-import os
+from be import conf
+from be.model import indexes
+from be.model import storage
 
-uri = os.getenv('MONGODB_API')
 
 class MongoDB_client:
     __socket = None
     __database = None
 
     def __init__(self):
-        ### 注释行为本地数据库使用 ###
-        # self.socket = pymongo.MongoClient('mongodb://localhost:27017')
-        self.socket = pymongo.MongoClient(uri, server_api=pymongo.server_api.ServerApi('1'))
-        self.check_and_delete_database('bookstore')
+        ### 客户端由 be.conf.Storage_Engine 选择：MongoDB 或进程内存储 ###
+        self.socket = storage.new_client()
+        if conf.Storage_Engine != "memory":
+            self.check_and_delete_database('bookstore')
         self.database = self.socket['bookstore']
+        ### 启动时对照索引声明，报告保留在 index_report 中 ###
+        self.index_report = indexes.ensure_indexes(self.database)
 
     def check_and_delete_database(self, database_name):
         if database_name in self.socket.list_database_names():
@@ -32,4 +34,4 @@ def get_db_conn():
     return database_instance.get_db_conn() if database_instance else init_database().get_db_conn()
 
 
-database_instance = init_database()
\ No newline at end of file
+database_instance = init_database()
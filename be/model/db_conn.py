@@ -1,12 +1,9 @@
 from be.model import database
-import pymongo
 
 class DBConn:
     def __init__(self):
+        ### 索引在启动时由 be.model.indexes 统一创建 ###
         self.conn = database.get_db_conn()
-        self.conn["user"].create_index([("user_id", pymongo.ASCENDING)])
-        self.conn["user_store"].create_index([("user_id", pymongo.ASCENDING), ("store_id", pymongo.ASCENDING)])
-        self.conn["store"].create_index([("book_id", pymongo.ASCENDING), ("store_id", pymongo.ASCENDING)])
 
     def user_id_exist(self, user_id):
         result = self.conn.user.find_one({"user_id": user_id})
@@ -0,0 +1,119 @@
+"""所有集合的索引声明，启动时统一应用并报告与数据库现状的差异。"""
+import logging
+import pymongo
+
+logger = logging.getLogger(__name__)
+
+ASC = pymongo.ASCENDING
+
+### 集合 -> 索引列表；unique 仅用于代码中假定唯一的字段 ###
+INDEXES = {
+    "user": [
+        {"keys": [("user_id", ASC)], "unique": True},
+    ],
+    "user_store": [
+        {"keys": [("store_id", ASC)], "unique": True},
+        {"keys": [("user_id", ASC), ("store_id", ASC)]},
+    ],
+    "store": [
+        {"keys": [("store_id", ASC), ("book_id", ASC)], "unique": True},
+    ],
+    "books": [
+        {"keys": [("id", ASC)], "unique": True},
+    ],
+    "new_order": [
+        {"keys": [("order_id", ASC)], "unique": True},
+    ],
+    "new_order_detail": [
+        {"keys": [("order_id", ASC)]},
+    ],
+    "order_history": [
+        {"keys": [("order_id", ASC)], "unique": True},
+        {"keys": [("user_id", ASC)]},
+        {"keys": [("store_id", ASC)]},
+    ],
+    "order_history_detail": [
+        {"keys": [("order_id", ASC)]},
+    ],
+}
+
+
+def index_name(keys) -> str:
+    return "_".join("{}_{}".format(field, direction) for field, direction in keys)
+
+
+def _normalize(info: dict) -> dict:
+    return {
+        "keys": [(field, int(direction)) for field, direction in info["key"]],
+        "unique": bool(info.get("unique", False)),
+    }
+
+
+def diff_indexes(db) -> dict:
+    """比较声明与现有索引，返回 {集合: {"missing": [...], "mismatched": [...], "extra": [...]}}。"""
+    report = {}
+    existing_collections = set(db.list_collection_names())
+    for collection, specs in INDEXES.items():
+        existing = {}
+        if collection in existing_collections:
+            existing = {
+                name: _normalize(info)
+                for name, info in db[collection].index_information().items()
+                if name != "_id_"
+            }
+        declared = {index_name(spec["keys"]): spec for spec in specs}
+        missing, mismatched = [], []
+        for name, spec in declared.items():
+            current = existing.get(name)
+            wanted = {"keys": list(spec["keys"]), "unique": spec.get("unique", False)}
+            if current is None:
+                missing.append(name)
+            elif current != wanted:
+                mismatched.append(name)
+        extra = [name for name in existing if name not in declared]
+        if missing or mismatched or extra:
+            report[collection] = {"missing": missing, "mismatched": mismatched, "extra": extra}
+    return report
+
+
+def _create(db, collection: str, name: str, spec: dict):
+    db[collection].create_index(spec["keys"], name=name, unique=spec.get("unique", False))
+
+
+def ensure_indexes(db, drop_extra: bool = False) -> dict:
+    """创建缺失索引、重建定义不一致的索引；多余索引默认只报告不删除。
+
+    重建唯一索引时若已有重复数据，则恢复为非唯一索引并记入 "failed"，不中断启动。
+    """
+    report = diff_indexes(db)
+    for collection, diff in report.items():
+        specs = {index_name(spec["keys"]): spec for spec in INDEXES[collection]}
+        diff["failed"] = []
+        for name in diff["mismatched"]:
+            db[collection].drop_index(name)
+        for name in diff["missing"] + diff["mismatched"]:
+            try:
+                _create(db, collection, name, specs[name])
+            except pymongo.errors.OperationFailure as e:
+                diff["failed"].append({"name": name, "error": str(e)})
+                _create(db, collection, name, {"keys": specs[name]["keys"]})
+        if drop_extra:
+            for name in diff["extra"]:
+                db[collection].drop_index(name)
+    ### 只有定义不一致、多余或重建失败时才告警；新库缺失索引属于正常情况 ###
+    problems = {c: d for c, d in report.items() if d["mismatched"] or d["extra"] or d["failed"]}
+    if problems:
+        logger.warning("index catalog differs from declaration:\n%s", format_report(problems))
+    elif report:
+        logger.info("index catalog created:\n%s", format_report(report))
+    return report
+
+
+def format_report(report: dict) -> str:
+    lines = []
+    for collection, diff in report.items():
+        lines.append("{}: missing={} mismatched={} extra={} failed={}".format(
+            collection, diff["missing"], diff["mismatched"], diff["extra"],
+            [f["name"] for f in diff.get("failed", [])],
+        ))
+    return "\n".join(lines)
@@ -0,0 +1,652 @@
+"""进程内存储引擎，实现 be.model.storage 定义的 pymongo 子集。
+
+每个集合持有一把锁，单文档操作在锁内完成，与 MongoDB 的单文档原子性一致；
+唯一索引会抛出与 pymongo 相同的 DuplicateKeyError / BulkWriteError。
+"""
+import re
+import threading
+from bson import ObjectId
+from pymongo import operations
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+from pymongo.results import (
+    BulkWriteResult,
+    DeleteResult,
+    InsertManyResult,
+    InsertOneResult,
+    UpdateResult,
+)
+from be.model import storage
+
+_MISSING = object()
+
+
+def _clone(value):
+    if isinstance(value, dict):
+        return {k: _clone(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_clone(v) for v in value]
+    return value
+
+
+def _get(doc, path: str):
+    value = doc
+    for part in path.split("."):
+        if isinstance(value, dict) and part in value:
+            value = value[part]
+        else:
+            return _MISSING
+    return value
+
+
+def _set(doc, path: str, value):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.setdefault(part, {})
+    doc[parts[-1]] = value
+
+
+def _unset(doc, path: str):
+    head, _, rest = path.partition(".")
+    if not rest:
+        doc.pop(head, None)
+        return
+    child = doc.get(head)
+    for item in (child if isinstance(child, list) else [child]):
+        if isinstance(item, dict):
+            _unset(item, rest)
+
+
+def _hashable(value):
+    if isinstance(value, list):
+        return tuple(_hashable(v) for v in value)
+    if isinstance(value, dict):
+        return tuple((k, _hashable(v)) for k, v in value.items())
+    return value
+
+
+def _compare(op, value, target) -> bool:
+    if value is _MISSING or value is None:
+        return False
+    try:
+        if op == "$gt":
+            return value > target
+        if op == "$gte":
+            return value >= target
+        if op == "$lt":
+            return value < target
+        return value <= target
+    except TypeError:
+        return False
+
+
+def _equals(value, target) -> bool:
+    if value is _MISSING:
+        return target is None
+    if isinstance(value, list) and not isinstance(target, list):
+        return target in value
+    return value == target
+
+
+def _match_operator(value, op, target, condition) -> bool:
+    if op == "$eq":
+        return _equals(value, target)
+    if op == "$ne":
+        return not _equals(value, target)
+    if op in ("$gt", "$gte", "$lt", "$lte"):
+        if isinstance(value, list):
+            return any(_compare(op, v, target) for v in value)
+        return _compare(op, value, target)
+    if op == "$in":
+        return any(_equals(value, t) for t in target)
+    if op == "$nin":
+        return not any(_equals(value, t) for t in target)
+    if op == "$exists":
+        return (value is not _MISSING) == bool(target)
+    if op == "$regex":
+        flags = re.IGNORECASE if "i" in condition.get("$options", "") else 0
+        candidates = value if isinstance(value, list) else [value]
+        return any(isinstance(v, str) and re.search(target, v, flags) for v in candidates)
+    if op == "$options":
+        return True
+    if op == "$not":
+        return not _match_value(value, target)
+    raise OperationFailure("unsupported query operator {}".format(op))
+
+
+def _match_value(value, condition) -> bool:
+    if isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition):
+        return all(_match_operator(value, op, target, condition) for op, target in condition.items())
+    return _equals(value, condition)
+
+
+def _match(doc, filter) -> bool:
+    for key, condition in (filter or {}).items():
+        if key == "$and":
+            if not all(_match(doc, f) for f in condition):
+                return False
+        elif key == "$or":
+            if not any(_match(doc, f) for f in condition):
+                return False
+        elif key == "$nor":
+            if any(_match(doc, f) for f in condition):
+                return False
+        elif not _match_value(_get(doc, key), condition):
+            return False
+    return True
+
+
+def _project(doc, projection):
+    if not projection:
+        return _clone(doc)
+    if isinstance(projection, (list, tuple)):
+        projection = {field: 1 for field in projection}
+    include_id = projection.get("_id", 1)
+    fields = {k: v for k, v in projection.items() if k != "_id"}
+    if fields and any(fields.values()):
+        result = {}
+        for field in fields:
+            value = _get(doc, field)
+            if value is not _MISSING:
+                _set(result, field, _clone(value))
+    else:
+        result = _clone(doc)
+        for field in fields:
+            _unset(result, field)
+    if include_id and "_id" in doc:
+        result["_id"] = doc["_id"]
+    elif not include_id:
+        result.pop("_id", None)
+    return result
+
+
+def _sort_key(value):
+    ### None/缺失字段排在最前，与 MongoDB 的 BSON 比较顺序一致 ###
+    if value is _MISSING or value is None:
+        return (0, 0)
+    if isinstance(value, (int, float)):
+        return (1, value)
+    return (2, str(value))
+
+
+def _sort(docs, sort):
+    if isinstance(sort, dict):
+        sort = list(sort.items())
+    for key, direction in reversed(sort):
+        docs.sort(key=lambda d: _sort_key(_get(d, key)), reverse=direction < 0)
+    return docs
+
+
+def _apply_update(doc, update, inserting=False) -> None:
+    if not any(k.startswith("$") for k in update):
+        doc_id = doc.get("_id")
+        doc.clear()
+        doc.update(_clone(update))
+        if doc_id is not None:
+            doc["_id"] = doc_id
+        return
+    for op, fields in update.items():
+        for path, arg in fields.items():
+            if op == "$set" or (op == "$setOnInsert" and inserting):
+                _set(doc, path, _clone(arg))
+            elif op == "$setOnInsert":
+                continue
+            elif op == "$unset":
+                _unset(doc, path)
+            elif op == "$inc":
+                current = _get(doc, path)
+                _set(doc, path, (0 if current is _MISSING else current) + arg)
+            elif op in ("$min", "$max"):
+                current = _get(doc, path)
+                if current is _MISSING or (arg < current if op == "$min" else arg > current):
+                    _set(doc, path, arg)
+            elif op in ("$push", "$addToSet"):
+                current = _get(doc, path)
+                items = current if isinstance(current, list) else []
+                values = arg["$each"] if isinstance(arg, dict) and "$each" in arg else [arg]
+                for value in values:
+                    if op == "$push" or value not in items:
+                        items.append(_clone(value))
+                _set(doc, path, items)
+            elif op == "$pull":
+                current = _get(doc, path)
+                if isinstance(current, list):
+                    _set(doc, path, [v for v in current if not _match_value(v, arg)])
+            else:
+                raise OperationFailure("unsupported update operator {}".format(op))
+
+
+class _Index:
+    def __init__(self, name: str, keys, unique: bool, options: dict):
+        self.name = name
+        self.keys = keys
+        self.fields = tuple(k for k, _ in keys)
+        self.unique = unique
+        self.options = options
+        self.multikey = False
+        self.entries = {}
+
+    def key_of(self, doc):
+        values = []
+        for field in self.fields:
+            value = _get(doc, field)
+            if isinstance(value, list):
+                self.multikey = True
+            values.append(None if value is _MISSING else _hashable(value))
+        return tuple(values)
+
+    def add(self, doc):
+        self.entries.setdefault(self.key_of(doc), set()).add(doc["_id"])
+
+    def remove(self, doc):
+        key = self.key_of(doc)
+        ids = self.entries.get(key)
+        if ids is not None:
+            ids.discard(doc["_id"])
+            if not ids:
+                del self.entries[key]
+
+    def conflicts(self, doc) -> bool:
+        return self.unique and bool(self.entries.get(self.key_of(doc), set()) - {doc["_id"]})
+
+    def info(self) -> dict:
+        info = {"v": 2, "key": list(self.keys)}
+        if self.unique and self.name != "_id_":
+            info["unique"] = True
+        info.update(self.options)
+        return info
+
+
+def _normalize_keys(keys):
+    if isinstance(keys, str):
+        return [(keys, 1)]
+    if isinstance(keys, dict):
+        return list(keys.items())
+    return [(k, d) for k, d in keys]
+
+
+class _Cursor:
+    def __init__(self, collection, filter, projection, sort=None, skip=0, limit=0):
+        self._collection = collection
+        self._filter = filter
+        self._projection = projection
+        self._sort = sort
+        self._skip = skip
+        self._limit = limit
+        self._results = None
+
+    def sort(self, key_or_list, direction=1):
+        self._sort = [(key_or_list, direction)] if isinstance(key_or_list, str) else key_or_list
+        return self
+
+    def skip(self, n: int):
+        self._skip = n
+        return self
+
+    def limit(self, n: int):
+        self._limit = n
+        return self
+
+    def batch_size(self, n: int):
+        return self
+
+    def _evaluate(self):
+        if self._results is None:
+            docs = self._collection._select(self._filter, self._sort, self._skip, self._limit)
+            self._results = iter([_project(d, self._projection) for d in docs])
+        return self._results
+
+    def __iter__(self):
+        return self._evaluate()
+
+    def __next__(self):
+        return next(self._evaluate())
+
+    def close(self):
+        self._results = iter(())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class MemoryCollection(storage.Collection):
+    def __init__(self, database, name: str):
+        self.database = database
+        self.name = name
+        self._lock = threading.RLock()
+        self._docs = {}
+        self._order = {}
+        self._next_order = 0
+        self._indexes = {"_id_": _Index("_id_", [("_id", 1)], True, {})}
+
+    # ---- 查询 ----
+    def _candidates(self, filter):
+        ### 过滤条件覆盖某个索引的全部字段且均为等值条件时走哈希索引，否则全表扫描 ###
+        filter = filter or {}
+        for index in self._indexes.values():
+            if index.multikey or not all(f in filter for f in index.fields):
+                continue
+            values = [filter[f] for f in index.fields]
+            if any(isinstance(v, dict) for v in values):
+                continue
+            ids = index.entries.get(tuple(_hashable(v) for v in values), ())
+            return [self._docs[i] for i in ids]
+        return self._docs.values()
+
+    def _select(self, filter, sort=None, skip=0, limit=0):
+        with self._lock:
+            docs = [d for d in self._candidates(filter) if _match(d, filter)]
+            if sort:
+                _sort(docs, sort)
+            elif len(docs) > 1:
+                docs.sort(key=lambda d: self._order[d["_id"]])
+            if skip:
+                docs = docs[skip:]
+            if limit:
+                docs = docs[:limit]
+            return [_clone(d) for d in docs]
+
+    def find(self, filter=None, projection=None, sort=None, skip=0, limit=0, **kwargs):
+        return _Cursor(self, filter, projection, sort, skip, limit)
+
+    def find_one(self, filter=None, projection=None, sort=None, **kwargs):
+        docs = self._select(filter, sort, 0, 1)
+        return _project(docs[0], projection) if docs else None
+
+    def count_documents(self, filter, **kwargs):
+        with self._lock:
+            return sum(1 for d in self._candidates(filter) if _match(d, filter))
+
+    def estimated_document_count(self):
+        return len(self._docs)
+
+    def distinct(self, key, filter=None):
+        values = []
+        for doc in self._select(filter):
+            value = _get(doc, key)
+            for v in (value if isinstance(value, list) else [value]):
+                if v is not _MISSING and v not in values:
+                    values.append(v)
+        return values
+
+    # ---- 写入 ----
+    def _insert(self, document):
+        if "_id" not in document:
+            document["_id"] = ObjectId()
+        doc = _clone(document)
+        for index in self._indexes.values():
+            if index.conflicts(doc):
+                raise DuplicateKeyError(
+                    "E11000 duplicate key error collection: {} index: {}".format(self.name, index.name), 11000
+                )
+        self._docs[doc["_id"]] = doc
+        self._order[doc["_id"]] = self._next_order
+        self._next_order += 1
+        for index in self._indexes.values():
+            index.add(doc)
+        return doc["_id"]
+
+    def _replace(self, old, new) -> bool:
+        for index in self._indexes.values():
+            if index.conflicts(new):
+                raise DuplicateKeyError(
+                    "E11000 duplicate key error collection: {} index: {}".format(self.name, index.name), 11000
+                )
+        for index in self._indexes.values():
+            index.remove(old)
+            index.add(new)
+        self._docs[new["_id"]] = new
+        return old != new
+
+    def _update(self, filter, update, upsert, many):
+        matched = modified = 0
+        upserted_id = None
+        with self._lock:
+            targets = [d for d in self._candidates(filter) if _match(d, filter)]
+            if not many:
+                targets = targets[:1]
+            for old in targets:
+                new = _clone(old)
+                _apply_update(new, update)
+                matched += 1
+                if self._replace(old, new):
+                    modified += 1
+            if not targets and upsert:
+                doc = {k: _clone(v) for k, v in filter.items()
+                       if not k.startswith("$") and not (isinstance(v, dict) and any(s.startswith("$") for s in v))}
+                _apply_update(doc, update, inserting=True)
+                upserted_id = self._insert(doc)
+        raw = {"n": matched if upserted_id is None else 1, "nModified": modified}
+        if upserted_id is not None:
+            raw["upserted"] = upserted_id
+        return raw
+
+    def insert_one(self, document, **kwargs):
+        with self._lock:
+            return InsertOneResult(self._insert(document), True)
+
+    def insert_many(self, documents, ordered=True, **kwargs):
+        result = self.bulk_write([operations.InsertOne(d) for d in documents], ordered=ordered)
+        return InsertManyResult([d["_id"] for d in documents if "_id" in d][:result.inserted_count], True)
+
+    def update_one(self, filter, update, upsert=False, **kwargs):
+        return UpdateResult(self._update(filter, update, upsert, many=False), True)
+
+    def update_many(self, filter, update, upsert=False, **kwargs):
+        return UpdateResult(self._update(filter, update, upsert, many=True), True)
+
+    def replace_one(self, filter, replacement, upsert=False, **kwargs):
+        return UpdateResult(self._update(filter, replacement, upsert, many=False), True)
+
+    def find_one_and_update(self, filter, update, projection=None, sort=None, upsert=False,
+                            return_document=False, **kwargs):
+        with self._lock:
+            docs = [d for d in self._candidates(filter) if _match(d, filter)]
+            if sort:
+                _sort(docs, sort)
+            if not docs:
+                if not upsert:
+                    return None
+                upserted_id = self._update(filter, update, True, many=False)["upserted"]
+                return _project(self._docs[upserted_id], projection) if return_document else None
+            old = docs[0]
+            new = _clone(old)
+            _apply_update(new, update)
+            self._replace(old, new)
+            return _project(new if return_document else old, projection)
+
+    def find_one_and_delete(self, filter, projection=None, sort=None, **kwargs):
+        with self._lock:
+            docs = [d for d in self._candidates(filter) if _match(d, filter)]
+            if sort:
+                _sort(docs, sort)
+            if not docs:
+                return None
+            self._delete_doc(docs[0])
+            return _project(docs[0], projection)
+
+    def _delete_doc(self, doc):
+        for index in self._indexes.values():
+            index.remove(doc)
+        del self._docs[doc["_id"]]
+        del self._order[doc["_id"]]
+
+    def _delete(self, filter, many) -> int:
+        with self._lock:
+            targets = [d for d in self._candidates(filter) if _match(d, filter)]
+            if not many:
+                targets = targets[:1]
+            for doc in targets:
+                self._delete_doc(doc)
+            return len(targets)
+
+    def delete_one(self, filter, **kwargs):
+        return DeleteResult({"n": self._delete(filter, many=False)}, True)
+
+    def delete_many(self, filter, **kwargs):
+        return DeleteResult({"n": self._delete(filter, many=True)}, True)
+
+    def bulk_write(self, requests, ordered=True, **kwargs):
+        result = {"writeErrors": [], "writeConcernErrors": [], "nInserted": 0, "nUpserted": 0,
+                  "nMatched": 0, "nModified": 0, "nRemoved": 0, "upserted": []}
+        with self._lock:
+            for i, op in enumerate(requests):
+                try:
+                    if isinstance(op, operations.InsertOne):
+                        self._insert(op._doc)
+                        result["nInserted"] += 1
+                    elif isinstance(op, (operations.UpdateOne, operations.UpdateMany, operations.ReplaceOne)):
+                        many = isinstance(op, operations.UpdateMany)
+                        raw = self._update(op._filter, op._doc, bool(op._upsert), many)
+                        if "upserted" in raw:
+                            result["nUpserted"] += 1
+                            result["upserted"].append({"index": i, "_id": raw["upserted"]})
+                        else:
+                            result["nMatched"] += raw["n"]
+                            result["nModified"] += raw["nModified"]
+                    elif isinstance(op, (operations.DeleteOne, operations.DeleteMany)):
+                        result["nRemoved"] += self._delete(op._filter, isinstance(op, operations.DeleteMany))
+                    else:
+                        raise OperationFailure("unsupported bulk operation {!r}".format(op))
+                except DuplicateKeyError as e:
+                    result["writeErrors"].append({"index": i, "code": 11000, "errmsg": str(e), "op": op})
+                    if ordered:
+                        break
+        if result["writeErrors"]:
+            raise BulkWriteError(result)
+        return BulkWriteResult(result, True)
+
+    # ---- 聚合 ----
+    def aggregate(self, pipeline, **kwargs):
+        docs = None
+        for stage in pipeline:
+            (name, spec), = stage.items()
+            if docs is None:
+                if name == "$match":
+                    docs = self._select(spec)
+                    continue
+                docs = self._select({})
+            if name == "$match":
+                docs = [d for d in docs if _match(d, spec)]
+            elif name == "$lookup":
+                foreign = self.database[spec["from"]]
+                for doc in docs:
+                    local = _get(doc, spec["localField"])
+                    local = None if local is _MISSING else local
+                    condition = {"$in": local} if isinstance(local, list) else local
+                    doc[spec["as"]] = foreign._select({spec["foreignField"]: condition})
+            elif name == "$project":
+                docs = [_project(d, spec) for d in docs]
+            elif name == "$sort":
+                docs = _sort(docs, spec)
+            elif name == "$skip":
+                docs = docs[spec:]
+            elif name == "$limit":
+                docs = docs[:spec]
+            elif name == "$unwind":
+                path = spec if isinstance(spec, str) else spec["path"]
+                field = path.lstrip("$")
+                docs = [dict(d, **{field: v}) for d in docs for v in (_get(d, field) or [])
+                        if isinstance(_get(d, field), list)]
+            elif name == "$count":
+                docs = [{spec: len(docs)}]
+            else:
+                raise OperationFailure("unsupported aggregation stage {}".format(name))
+        return iter(docs if docs is not None else self._select({}))
+
+    # ---- 索引 ----
+    def create_index(self, keys, unique=False, name=None, **kwargs):
+        keys = _normalize_keys(keys)
+        name = name or "_".join("{}_{}".format(k, d) for k, d in keys)
+        with self._lock:
+            if name in self._indexes:
+                return name
+            index = _Index(name, keys, unique, kwargs)
+            for doc in self._docs.values():
+                if index.conflicts(doc):
+                    raise DuplicateKeyError(
+                        "E11000 duplicate key error collection: {} index: {}".format(self.name, name), 11000
+                    )
+                index.add(doc)
+            self._indexes[name] = index
+        return name
+
+    def create_indexes(self, indexes):
+        return [self.create_index(i.document["key"].items(), **{k: v for k, v in i.document.items() if k != "key"})
+                for i in indexes]
+
+    def drop_index(self, index_or_name):
+        name = index_or_name if isinstance(index_or_name, str) else \
+            "_".join("{}_{}".format(k, d) for k, d in _normalize_keys(index_or_name))
+        with self._lock:
+            if name == "_id_" or name not in self._indexes:
+                raise OperationFailure("index not found with name [{}]".format(name))
+            del self._indexes[name]
+
+    def index_information(self):
+        with self._lock:
+            return {name: index.info() for name, index in self._indexes.items()}
+
+    def drop(self):
+        self.database.drop_collection(self.name)
+
+
+class MemoryDatabase(storage.Database):
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._collections = {}
+
+    def __getitem__(self, name) -> MemoryCollection:
+        collection = self._collections.get(name)
+        if collection is None:
+            with self._lock:
+                collection = self._collections.setdefault(name, MemoryCollection(self, name))
+        return collection
+
+    def __getattr__(self, name) -> MemoryCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def get_collection(self, name) -> MemoryCollection:
+        return self[name]
+
+    def list_collection_names(self):
+        return [name for name, c in self._collections.items() if c._docs or len(c._indexes) > 1]
+
+    def drop_collection(self, name):
+        with self._lock:
+            self._collections.pop(name, None)
+
+
+class MemoryClient:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._databases = {}
+
+    def __getitem__(self, name) -> MemoryDatabase:
+        with self._lock:
+            return self._databases.setdefault(name, MemoryDatabase(name))
+
+    def get_database(self, name) -> MemoryDatabase:
+        return self[name]
+
+    def list_database_names(self):
+        return list(self._databases)
+
+    def drop_database(self, name):
+        with self._lock:
+            self._databases.pop(name, None)
+
+    def close(self):
+        pass
+
+
+_shared_client = MemoryClient()
+
+
+def shared_client() -> MemoryClient:
+    return _shared_client
@@ -35,6 +35,8 @@ class Seller(db_conn.DBConn):
             self.db['user_store'].insert_one(store_data)
             return 200, "ok"
             
+        except pymongo.errors.DuplicateKeyError:
+            return error.error_exist_store_id(store_id)
         except pymongo.errors.PyMongoError as e:
             return self._handle_error(528, str(e))
         except Exception as e:
@@ -61,6 +63,8 @@ class Seller(db_conn.DBConn):
             self.db['store'].insert_one(book_data)
             return 200, "ok"
             
+        except pymongo.errors.DuplicateKeyError:
+            return error.error_exist_book_id(book_id)
         except pymongo.errors.PyMongoError as e:
             return self._handle_error(528, str(e))
         except Exception as e:
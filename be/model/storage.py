@@ -0,0 +1,101 @@
+"""存储引擎接口。
+
+模型层只使用 pymongo ``Database`` / ``Collection`` 接口的一个子集，
+这里把这个子集固定下来，MongoDB 与进程内存储引擎 (be.model.memory_db) 都满足该接口，
+通过 ``be.conf.Storage_Engine`` 选择。
+"""
+import abc
+import pymongo
+from pymongo.collection import Collection as _MongoCollection
+from pymongo.database import Database as _MongoDatabase
+from be import conf
+
+
+class Collection(abc.ABC):
+    @abc.abstractmethod
+    def find_one(self, filter=None, projection=None, sort=None):
+        pass
+
+    @abc.abstractmethod
+    def find(self, filter=None, projection=None, sort=None, skip=0, limit=0):
+        pass
+
+    @abc.abstractmethod
+    def count_documents(self, filter):
+        pass
+
+    @abc.abstractmethod
+    def insert_one(self, document):
+        pass
+
+    @abc.abstractmethod
+    def insert_many(self, documents, ordered=True):
+        pass
+
+    @abc.abstractmethod
+    def update_one(self, filter, update, upsert=False):
+        pass
+
+    @abc.abstractmethod
+    def update_many(self, filter, update, upsert=False):
+        pass
+
+    @abc.abstractmethod
+    def find_one_and_update(self, filter, update, projection=None, sort=None, upsert=False, return_document=False):
+        pass
+
+    @abc.abstractmethod
+    def delete_one(self, filter):
+        pass
+
+    @abc.abstractmethod
+    def delete_many(self, filter):
+        pass
+
+    @abc.abstractmethod
+    def bulk_write(self, requests, ordered=True):
+        pass
+
+    @abc.abstractmethod
+    def aggregate(self, pipeline):
+        pass
+
+    @abc.abstractmethod
+    def create_index(self, keys, **kwargs):
+        pass
+
+    @abc.abstractmethod
+    def drop_index(self, index_or_name):
+        pass
+
+    @abc.abstractmethod
+    def index_information(self):
+        pass
+
+
+class Database(abc.ABC):
+    @abc.abstractmethod
+    def __getitem__(self, name) -> Collection:
+        pass
+
+    @abc.abstractmethod
+    def list_collection_names(self):
+        pass
+
+    @abc.abstractmethod
+    def drop_collection(self, name):
+        pass
+
+
+Collection.register(_MongoCollection)
+Database.register(_MongoDatabase)
+
+
+def new_client():
+    """按配置创建客户端；内存引擎在进程内共享同一份数据。"""
+    if conf.Storage_Engine == "memory":
+        from be.model import memory_db
+        return memory_db.shared_client()
+    ### 注释行为本地数据库使用 ###
+    # return pymongo.MongoClient('mongodb://localhost:27017')
+    return pymongo.MongoClient(conf.MongoDB_URI, server_api=pymongo.server_api.ServerApi('1'))
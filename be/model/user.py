@@ -83,6 +83,8 @@ class User(db_conn.DBConn):
             db['user'].insert_one(account_data)
             return 200, "ok"
             
+        except pymongo.errors.DuplicateKeyError:
+            return error.error_exist_user_id(user_id)
         except pymongo.errors.PyMongoError as e:
             return self._handle_error(528, str(e))
         except Exception as e:
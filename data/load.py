@@ -1,48 +1,135 @@
-import sqlite3
-import pymongo
-import os
-
-def load_books(Use_Large_DB: bool):
-    ### 读取本地 SQLite 文件 ###
-    sqlite_conn = sqlite3.connect(os.path.join(os.path.dirname(__file__), './book_lx.db' if Use_Large_DB else './book.db'))
-    sqlite_cursor = sqlite_conn.cursor()
-
-    ### 注释行为本地数据库使用 ###
-    mongo_socket = pymongo.MongoClient(os.getenv('MONGODB_API'), server_api=pymongo.server_api.ServerApi('1'))
-    # mongo_socket = pymongo.MongoClient('mongodb://localhost:27017')
-    db = mongo_socket['bookstore']
-
-    ### 防止重复导入 ###
-    if 'books' in db.list_collection_names():
-        db.drop_collection('books')
-        print(f"Succeed to init collection 'books'.")
-
-    ### 查询 SQLite 数据 ###
-    sqlite_cursor.execute('SELECT * FROM book')
-    rows = sqlite_cursor.fetchall()
-
-    ### 将数据插入到 MongoDB ###
-    for row in rows:
-        db['books'].insert_one({
-            'id': row[0],
-            'title': row[1],
-            'author': row[2],
-            'publisher': row[3],
-            'original_title': row[4],
-            'translator': row[5],
-            'pub_year': row[6],
-            'pages': row[7],
-            'price': row[8],
-            'currency_unit': row[9],
-            'binding': row[10],
-            'isbn': row[11],
-            'author_intro': row[12],
-            'book_intro': row[13],
-            'content': row[14],
-            'tags': row[15],
-            'picture': row[16],
-        })
-
-    # 关闭连接
-    sqlite_conn.close()
-    mongo_socket.close()
\ No newline at end of file
+import sqlite3
+import pymongo
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from be.model import storage
+
+### 每批从 SQLite 读取并写入 MongoDB 的行数 ###
+BATCH_SIZE = 500
+### 并发写入 MongoDB 的线程数 ###
+WORKER_NUM = 4
+### 记录导入进度的集合，用于断点续传 ###
+PROGRESS_COLLECTION = 'load_progress'
+
+BOOK_COLUMNS = (
+    'id', 'title', 'author', 'publisher', 'original_title', 'translator',
+    'pub_year', 'pages', 'price', 'currency_unit', 'binding', 'isbn',
+    'author_intro', 'book_intro', 'content', 'tags', 'picture',
+)
+
+
+class _Checkpoint:
+    """跟踪已提交批次，只把连续完成的最大 id 写入进度集合。
+
+    并发写入时批次完成的顺序不确定，若直接记录最大 id，中断后可能跳过尚未写入的批次。
+    """
+
+    def __init__(self, db, source: str):
+        self.db = db
+        self.source = source
+        self.lock = threading.Lock()
+        self.next_seq = 0
+        self.done = {}
+        self.rows = 0
+
+    def last_id(self):
+        doc = self.db[PROGRESS_COLLECTION].find_one({'source': self.source})
+        return doc['last_id'] if doc else None
+
+    def reset(self):
+        self.db[PROGRESS_COLLECTION].delete_one({'source': self.source})
+
+    def commit(self, seq: int, last_id: str, rows: int):
+        with self.lock:
+            self.done[seq] = last_id
+            self.rows += rows
+            watermark = None
+            while self.next_seq in self.done:
+                watermark = self.done.pop(self.next_seq)
+                self.next_seq += 1
+            if watermark is not None:
+                self.db[PROGRESS_COLLECTION].update_one(
+                    {'source': self.source},
+                    {'$set': {'last_id': watermark, 'updated_at': int(time.time())}},
+                    upsert=True,
+                )
+
+
+def _to_document(row) -> dict:
+    return dict(zip(BOOK_COLUMNS, row))
+
+
+def _write_batch(db, batch: list):
+    try:
+        db['books'].insert_many(batch, ordered=False)
+    except pymongo.errors.BulkWriteError as e:
+        ### 续传时可能重复写入中断前已提交的批次，忽略重复键错误 ###
+        others = [err for err in e.details.get('writeErrors', []) if err.get('code') != 11000]
+        if others:
+            raise
+
+
+def load_books(Use_Large_DB: bool, batch_size: int = BATCH_SIZE, workers: int = WORKER_NUM, resume: bool = False):
+    ### 读取本地 SQLite 文件 ###
+    source = './book_lx.db' if Use_Large_DB else './book.db'
+    sqlite_conn = sqlite3.connect(os.path.join(os.path.dirname(__file__), source))
+    sqlite_cursor = sqlite_conn.cursor()
+    sqlite_cursor.arraysize = batch_size
+
+    ### 客户端由 be.conf.Storage_Engine 选择 ###
+    mongo_socket = storage.new_client()
+    db = mongo_socket['bookstore']
+    checkpoint = _Checkpoint(db, source)
+
+    ### 防止重复导入；续传时保留已导入的数据 ###
+    last_id = checkpoint.last_id() if resume else None
+    if last_id is None:
+        checkpoint.reset()
+        if 'books' in db.list_collection_names():
+            db.drop_collection('books')
+            print(f"Succeed to init collection 'books'.")
+    db['books'].create_index([('id', pymongo.ASCENDING)], unique=True)
+
+    ### 按 id 顺序流式读取 SQLite 数据 ###
+    if last_id is None:
+        sqlite_cursor.execute('SELECT {} FROM book ORDER BY id'.format(', '.join(BOOK_COLUMNS)))
+    else:
+        print(f"Resume loading 'books' after id {last_id}.")
+        sqlite_cursor.execute(
+            'SELECT {} FROM book WHERE id > ? ORDER BY id'.format(', '.join(BOOK_COLUMNS)), (last_id,)
+        )
+
+    ### 分批写入 MongoDB，限制同时在途的批次数以控制内存占用 ###
+    start = time.time()
+    in_flight = threading.BoundedSemaphore(workers * 2)
+    futures = []
+
+    def write(seq, batch):
+        try:
+            _write_batch(db, batch)
+            checkpoint.commit(seq, batch[-1]['id'], len(batch))
+        finally:
+            in_flight.release()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        seq = 0
+        while True:
+            rows = sqlite_cursor.fetchmany()
+            if not rows:
+                break
+            in_flight.acquire()
+            futures.append(pool.submit(write, seq, [_to_document(row) for row in rows]))
+            seq += 1
+        for future in futures:
+            future.result()
+
+    elapsed = time.time() - start
+    rate = checkpoint.rows / elapsed if elapsed > 0 else float(checkpoint.rows)
+    print(f"Loaded {checkpoint.rows} books in {elapsed:.2f}s ({rate:.0f} rows/s).")
+
+    # 关闭连接
+    sqlite_conn.close()
+    mongo_socket.close()
+    return checkpoint.rows
@@ -1,7 +1,7 @@
-import os
 import random
 import base64
 import pymongo
+from be.model import storage
 
 # 图书类，用于存储图书的相关信息
 class Book:
@@ -36,10 +36,8 @@ class BookDB:
 
     def __init__(self, not_used_param: bool = False):
         # 初始化数据库连接
-        ### 注释行专为本地数据库使用 ###
-        # 使用环境变量中的 MONGODB_API 连接到 MongoDB 数据库
-        self.socket = pymongo.MongoClient(os.getenv('MONGODB_API'), server_api=pymongo.server_api.ServerApi('1'))
-        # self.socket = pymongo.MongoClient('mongodb://localhost:27017')  # 也可以直接连接到本地数据库
+        # 客户端由 be.conf.Storage_Engine 选择：MongoDB 或与后端共享的进程内存储
+        self.socket = storage.new_client()
         self.db = self.socket['bookstore']  # 选择 'bookstore' 数据库
 
         # 为 'books' 集合的 'id' 字段创建索引，提高查询效率
@@ -0,0 +1,50 @@
+import pymongo
+
+from be.model import indexes
+from be.model.memory_db import MemoryClient
+
+
+class TestIndexCatalog:
+    def setup_method(self):
+        self.db = MemoryClient()["bookstore"]
+
+    def test_fresh_database_missing_all(self):
+        report = indexes.diff_indexes(self.db)
+        assert set(report) == set(indexes.INDEXES)
+        indexes.ensure_indexes(self.db)
+        assert indexes.diff_indexes(self.db) == {}
+
+    def test_extra_mismatched_missing(self):
+        indexes.ensure_indexes(self.db)
+        self.db["user"].create_index([("balance", pymongo.ASCENDING)])
+        self.db["new_order"].drop_index("order_id_1")
+        self.db["new_order"].create_index([("order_id", pymongo.ASCENDING)])
+        self.db["order_history"].drop_index("store_id_1")
+
+        report = indexes.diff_indexes(self.db)
+        assert report == {
+            "user": {"missing": [], "mismatched": [], "extra": ["balance_1"]},
+            "new_order": {"missing": [], "mismatched": ["order_id_1"], "extra": []},
+            "order_history": {"missing": ["store_id_1"], "mismatched": [], "extra": []},
+        }
+
+        report = indexes.ensure_indexes(self.db)
+        assert all(diff["failed"] == [] for diff in report.values())
+        assert indexes.diff_indexes(self.db) == {
+            "user": {"missing": [], "mismatched": [], "extra": ["balance_1"]},
+        }
+        assert self.db["new_order"].index_information()["order_id_1"]["unique"]
+
+        indexes.ensure_indexes(self.db, drop_extra=True)
+        assert indexes.diff_indexes(self.db) == {}
+
+    def test_unique_rebuild_with_duplicates(self):
+        indexes.ensure_indexes(self.db)
+        self.db["new_order"].drop_index("order_id_1")
+        self.db["new_order"].create_index([("order_id", pymongo.ASCENDING)])
+        self.db["new_order"].insert_many([{"order_id": "o"}, {"order_id": "o"}])
+
+        report = indexes.ensure_indexes(self.db)
+        assert [f["name"] for f in report["new_order"]["failed"]] == ["order_id_1"]
+        info = self.db["new_order"].index_information()
+        assert "order_id_1" in info and not info["order_id_1"].get("unique", False)